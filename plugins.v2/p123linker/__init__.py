@@ -1,13 +1,19 @@
 import ast
+import os
+import shutil
+import queue
 import sys
+import threading
 import time
-import hashlib
 import random
 from urllib.parse import quote, unquote
-from collections import deque
+from collections import defaultdict
+from itertools import count
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from datetime import datetime, timedelta
-from typing import Any, List, Dict, Tuple, Optional
+from typing import Any, List, Dict, NamedTuple, Tuple, Optional
 from pathlib import Path
+from hashlib import md5 as _md5
 
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -15,6 +21,7 @@ from apscheduler.triggers.cron import CronTrigger
 from fastapi import Request
 from fastapi.responses import JSONResponse, RedirectResponse
 import requests
+from requests.adapters import HTTPAdapter
 from cachetools import cached, TTLCache
 from p123 import P123Client, check_response
 
@@ -30,78 +37,358 @@ from app.schemas.types import EventType
 from app.utils.system import SystemUtils
 
 
+# 文件列表每页数量，网页端接口单页最多返回 100 条
+_FS_LIST_LIMIT = 100
+# 下载链接缓存，有效期需小于下载链接本身的有效期
+_DL_INFO_CACHE = TTLCache(maxsize=50_000, ttl=3600)
+# 网盘文件项缓存
+_FILEITEM_CACHE = TTLCache(maxsize=1024, ttl=900)
+# 每个线程独立的随机数生成器，避免共享模块级生成器
+_RNG_LOCAL = threading.local()
+
+
+def _rand31() -> int:
+    """
+    生成 [0, 2^31) 范围内的随机数，和Go示例的随机数范围一致
+    """
+    rng = getattr(_RNG_LOCAL, "rng", None)
+    if rng is None:
+        rng = _RNG_LOCAL.rng = random.Random()
+    return rng.getrandbits(31)
+
+
+class TokenBucket:
+    """
+    令牌桶限流器，可在多个线程间共享
+    """
+
+    def __init__(self, capacity: float, refill_rate: float):
+        """
+        :param capacity: 令牌桶容量，即允许的突发请求数
+        :param refill_rate: 每秒补充的令牌数
+        """
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        获取一个令牌，没有可用令牌时阻塞等待
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait_time = self._paused_until - now
+                else:
+                    self._tokens = min(
+                        self.capacity,
+                        self._tokens + (now - self._last) * self.refill_rate,
+                    )
+                    self._last = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait_time = (1 - self._tokens) / self.refill_rate
+            time.sleep(wait_time)
+
+    def pause(self, seconds: float):
+        """
+        请求失败时暂停发放令牌
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._last = self._paused_until
+            self._tokens = 0
+
+
+def _fs_list(
+    client: P123Client,
+    payload: dict,
+    limiter: Optional[TokenBucket] = None,
+    retries: int = 5,
+) -> dict:
+    """
+    获取文件列表，失败时指数退避重试
+    """
+    for attempt in range(retries):
+        if limiter:
+            limiter.acquire()
+        try:
+            resp = client.fs_list(payload)
+            # 成功时直接返回，只有失败时才构造异常
+            if resp.get("code", 0) in (0, 200):
+                return resp
+            raise OSError(f"code={resp.get('code')}, message={resp.get('message')}")
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            delay = min(2 ** (attempt + 1), 60)
+            logger.warning(f"【123云盘】获取文件列表失败，{delay} 秒后重试: {e}")
+            if limiter:
+                limiter.pause(delay)
+            else:
+                time.sleep(delay)
+
+
+def _list_dir(
+    client: P123Client,
+    parent_id: int,
+    limiter: Optional[TokenBucket] = None,
+    prefetch: bool = False,
+):
+    """
+    分页获取目录下的文件列表
+    prefetch 为 True 时，在处理当前页的同时后台请求下一页
+    Yields:
+        list: 每一页的文件信息
+    """
+
+    # 分页请求依次发出，复用同一个请求体，只更新分页字段
+    payload = {
+        "limit": _FS_LIST_LIMIT,
+        "next": 0,
+        "Page": 1,
+        "parentFileId": parent_id,
+        "inDirectSpace": "false",
+    }
+
+    def fetch_page(page: int, _next) -> dict:
+        payload["next"] = _next
+        payload["Page"] = page
+        resp = _fs_list(client, payload, limiter)
+        return resp.get("data")
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        page = 1
+        data = fetch_page(page, 0)
+        while True:
+            item_list = data.get("InfoList")
+            if not item_list:
+                break
+            _next = data.get("Next")
+            if _next == "-1":
+                yield item_list
+                break
+            page += 1
+            next_future = (
+                executor.submit(fetch_page, page, _next) if executor else None
+            )
+            yield item_list
+            data = next_future.result() if next_future else fetch_page(page, _next)
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _download_info_payload(item: dict) -> dict:
+    """
+    构建获取下载链接的请求体
+    """
+    return {
+        "Etag": item["Etag"],
+        "FileID": int(item["FileId"]),
+        "FileName": item["FileName"],
+        "S3KeyFlag": item["S3KeyFlag"],
+        "Size": int(item["Size"]),
+    }
+
+
+class _FileItem(NamedTuple):
+    """
+    iterdir 以元组形式返回的文件信息，按属性访问
+    """
+
+    id: int
+    name: str
+    relpath: str
+    is_dir: bool
+    size: int
+    etag: str
+    s3_key_flag: str
+    update_time: int
+
+    def download_info_payload(self) -> dict:
+        """
+        构建获取下载链接的请求体
+        """
+        return {
+            "Etag": self.etag,
+            "FileID": self.id,
+            "FileName": self.name,
+            "S3KeyFlag": self.s3_key_flag,
+            "Size": self.size,
+        }
+
+
+def _write_strm(file_path, content: bytes):
+    """
+    写入 STRM 文件，直接使用系统调用，不经过文本层
+    """
+    fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, content)
+    finally:
+        os.close(fd)
+
+
+def _get_update_time(item: dict) -> int:
+    """
+    获取文件修改时间戳
+    """
+    update_at = item.get("UpdateAt")
+    if update_at:
+        try:
+            return int(datetime.fromisoformat(update_at).timestamp())
+        except ValueError:
+            pass
+    return int(item.get("UpdateTime") or 0)
+
+
+def _iter_items(
+    item_list: list,
+    current_parent_id: int,
+    current_path: str,
+    stack: list,
+    only_file: bool = False,
+    as_tuple: bool = False,
+):
+    """
+    转换一页文件信息，子目录压入待遍历栈
+    as_tuple 为 True 时返回 _FileItem，否则返回字典
+    """
+    parent_id = int(current_parent_id)
+    for item in item_list:
+        is_dir = bool(item["Type"])
+        name = item["FileName"]
+        file_id = int(item["FileId"])
+        item_path = f"{current_path}/{name}" if current_path else name
+        # 新文件不一定会更新所有上级目录的修改时间，子目录总是需要遍历
+        if is_dir:
+            stack.append((file_id, item_path))
+        if is_dir and only_file:
+            continue
+        if as_tuple:
+            yield _FileItem(
+                file_id,
+                name,
+                item_path,
+                is_dir,
+                int(item.get("Size") or 0),
+                item.get("Etag", ""),
+                item.get("S3KeyFlag", ""),
+                _get_update_time(item),
+            )
+        elif is_dir:
+            yield {
+                **item,
+                "relpath": item_path,
+                "is_dir": is_dir,
+                "id": file_id,
+                "parent_id": parent_id,
+                "name": name,
+            }
+        else:
+            size = int(item["Size"])
+            etag = item["Etag"]
+            yield {
+                **item,
+                "relpath": item_path,
+                "is_dir": is_dir,
+                "id": file_id,
+                "parent_id": parent_id,
+                "name": name,
+                "size": size,
+                "md5": etag,
+                "uri": f"123://{quote(name)}|{size}|{etag}?{item['S3KeyFlag']}",
+            }
+
+
 def iterdir(
     client: P123Client,
     parent_id: int = 0,
     interval: int | float = 0,
     only_file: bool = False,
+    max_workers: int = 1,
+    as_tuple: bool = False,
+    limiter: Optional[TokenBucket] = None,
 ):
     """
     遍历文件列表
-    广度优先搜索
+    深度优先搜索，max_workers 大于 1 时并发获取多个目录
+    interval 为每个线程的平均请求间隔，由共享的令牌桶限流
+    limiter 不为空时使用传入的令牌桶并忽略 interval，多次遍历可共用同一请求额度
+    as_tuple 为 True 时返回 _FileItem 元组，字段按属性访问
     return:
         迭代器
     Yields:
         dict: 文件或目录信息（包含路径）
     """
-    queue = deque()
-    queue.append((parent_id, ""))
-    while queue:
-        current_parent_id, current_path = queue.popleft()
-        page = 1
-        _next = 0
-        while True:
-            payload = {
-                "limit": 100,
-                "next": _next,
-                "Page": page,
-                "parentFileId": current_parent_id,
-                "inDirectSpace": "false",
-            }
-            if interval != 0:
-                time.sleep(interval)
-            resp = client.fs_list(payload)
-            check_response(resp)
-            item_list = resp.get("data").get("InfoList")
-            if not item_list:
-                break
-            for item in item_list:
-                is_dir = bool(item["Type"])
-                item_path = (
-                    f"{current_path}/{item['FileName']}"
-                    if current_path
-                    else item["FileName"]
+    workers = max(1, max_workers)
+    if limiter is None and interval:
+        limiter = TokenBucket(capacity=workers, refill_rate=workers / interval)
+    stack = [(parent_id, "")]
+    if max_workers > 1:
+        yield from _iterdir_concurrent(
+            client, stack, limiter, only_file, max_workers, as_tuple
+        )
+        return
+    while stack:
+        current_parent_id, current_path = stack.pop()
+        for item_list in _list_dir(
+            client, current_parent_id, limiter, prefetch=True
+        ):
+            yield from _iter_items(
+                item_list,
+                current_parent_id,
+                current_path,
+                stack,
+                only_file,
+                as_tuple,
+            )
+
+
+def _iterdir_concurrent(
+    client: P123Client,
+    stack: list,
+    limiter: Optional[TokenBucket],
+    only_file: bool,
+    max_workers: int,
+    as_tuple: bool = False,
+):
+    """
+    使用线程池并发遍历目录，每个线程完整获取一个目录的所有分页
+    """
+
+    def list_all(dir_id: int) -> list:
+        return [
+            item
+            for item_list in _list_dir(client, dir_id, limiter)
+            for item in item_list
+        ]
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while stack or running:
+            while stack and len(running) < max_workers:
+                current_parent_id, current_path = stack.pop()
+                future = executor.submit(list_all, current_parent_id)
+                running[future] = (current_parent_id, current_path)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                current_parent_id, current_path = running.pop(future)
+                yield from _iter_items(
+                    future.result(),
+                    current_parent_id,
+                    current_path,
+                    stack,
+                    only_file,
+                    as_tuple,
                 )
-                if is_dir:
-                    queue.append((int(item["FileId"]), item_path))
-                if is_dir and only_file:
-                    continue
-                if is_dir:
-                    yield {
-                        **item,
-                        "relpath": item_path,
-                        "is_dir": is_dir,
-                        "id": int(item["FileId"]),
-                        "parent_id": int(current_parent_id),
-                        "name": item["FileName"],
-                    }
-                else:
-                    yield {
-                        **item,
-                        "relpath": item_path,
-                        "is_dir": is_dir,
-                        "id": int(item["FileId"]),
-                        "parent_id": int(current_parent_id),
-                        "name": item["FileName"],
-                        "size": int(item["Size"]),
-                        "md5": item["Etag"],
-                        "uri": f"123://{quote(item['FileName'])}|{int(item['Size'])}|{item['Etag']}?{item['S3KeyFlag']}",
-                    }
-            if resp.get("data").get("Next") == "-1":
-                break
-            else:
-                page += 1
-                _next = resp.get("data").get("Next")
 
 
 class FullSyncStrmHelper:
@@ -117,125 +404,853 @@ class FullSyncStrmHelper:
         server_address: str,
         storagechain,
         auto_download_mediainfo: bool = False,
+        list_workers: int = 8,
+        download_workers: int = 16,
     ):
-        self.rmt_mediaext = [
+        self.rmt_mediaext = frozenset(
             f".{ext.strip()}" for ext in user_rmt_mediaext.replace("，", ",").split(",")
-        ]
-        self.download_mediaext = [
+        )
+        self.download_mediaext = frozenset(
             f".{ext.strip()}"
             for ext in user_download_mediaext.replace("，", ",").split(",")
-        ]
+        )
         self.auto_download_mediainfo = auto_download_mediainfo
         self.client = client
         self.strm_count = 0
         self.mediainfo_count = 0
+        self._count_lock = threading.Lock()
+        self._known_dirs = set()
         self.server_address = server_address.rstrip("/")
         self._storagechain = storagechain
+        self.list_workers = list_workers
+        self.download_workers = download_workers
+        # 所有同步目录共用一个令牌桶，并发处理多个目录时总请求频率不变
+        self._limiter = TokenBucket(capacity=list_workers, refill_rate=list_workers)
+        self.write_batch_size = 512
+        self._strm_url_tmpl = (
+            f"{self.server_address}/api/v1/plugin/p123linker/redirect_url"
+            f"?apikey={settings.API_TOKEN}"
+            "&name={name}&size={size}&md5={md5}&s3_key_flag={s3_key_flag}"
+        )
+        self._session = requests.Session()
+        self._session.headers.update({"User-Agent": settings.USER_AGENT})
+        adapter = HTTPAdapter(
+            pool_connections=download_workers, pool_maxsize=download_workers
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
 
-    def generate_strm_files(self, full_sync_strm_paths):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
         """
-        生成 STRM 文件
+        关闭下载连接池
         """
-        media_paths = full_sync_strm_paths.split("\n")
-        for path in media_paths:
-            if not path:
-                continue
-            parts = path.split("#", 1)
-            pan_media_dir = parts[1]
-            target_dir = parts[0]
+        self._session.close()
 
-            try:
-                fileitem = self._storagechain.get_file_item(
-                    storage="123云盘", path=Path(pan_media_dir)
-                )
-                parent_id = int(fileitem.fileid)
-                logger.info(f"【全量STRM生成】网盘媒体目录 ID 获取成功: {parent_id}")
-            except Exception as e:
-                logger.error(f"【全量STRM生成】网盘媒体目录 ID 获取失败: {e}")
-                return False
+    @cached(
+        _FILEITEM_CACHE,
+        key=lambda self, storage, path: (storage, str(path)),
+        lock=threading.Lock(),
+    )
+    def _get_file_item(self, storage: str, path: Path):
+        """
+        获取网盘文件项
+        """
+        return self._storagechain.get_file_item(storage=storage, path=path)
 
-            try:
+    @cached(
+        _DL_INFO_CACHE,
+        key=lambda self, item: (item["Etag"], item["FileId"]),
+        lock=threading.Lock(),
+    )
+    def _get_download_url(self, item: dict) -> str:
+        """
+        获取文件下载链接
+        """
+        resp = self.client.download_info(
+            _download_info_payload(item),
+            base_url="",
+            async_=False,
+            headers={"User-Agent": settings.USER_AGENT},
+        )
+        check_response(resp)
+        return resp["data"]["DownloadUrl"]
+
+    def __download_mediainfo(self, item: dict, file_path: str) -> bool:
+        """
+        下载单个元数据文件
+        """
+        try:
+            if os.stat(file_path).st_size == int(item["Size"]):
+                logger.debug(f"【全量STRM生成】{item['FileName']} 已存在，跳过下载")
+                return True
+        except FileNotFoundError:
+            pass
+
+        download_url = self._get_download_url(item)
+
+        if not download_url:
+            logger.error(
+                f"【全量STRM生成】{item['FileName']} 下载链接获取失败，无法下载该文件"
+            )
+            return False
+
+        self._ensure_dir(file_path.rpartition("/")[0])
+
+        with self._session.get(download_url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            with open(file_path, "wb") as f:
+                shutil.copyfileobj(response.raw, f, length=1024 * 1024)
+
+        logger.debug("【全量STRM生成】保存 %s 文件成功: %s", item["FileName"], file_path)
+        return True
+
+    def _ensure_dir(self, file_dir: str):
+        """
+        创建目录，已创建过的目录不再重复调用
+        """
+        if file_dir not in self._known_dirs:
+            os.makedirs(file_dir, exist_ok=True)
+            self._known_dirs.add(file_dir)
+
+    def __flush_strm_files(self, pending_writes: list):
+        """
+        按目录批量写入 STRM 文件
+        """
+        if not pending_writes:
+            return
+        unchanged = 0
+        files_by_dir = defaultdict(list)
+        for file_path, content in pending_writes:
+            files_by_dir[file_path.rpartition("/")[0]].append((file_path, content))
+        for file_dir, files in files_by_dir.items():
+            self._ensure_dir(file_dir)
+            for file_path, content in files:
+                try:
+                    with open(file_path, "rb") as f:
+                        if f.read(len(content) + 1) == content:
+                            unchanged += 1
+                            continue
+                except OSError:
+                    pass
+                _write_strm(file_path, content)
+        with self._count_lock:
+            self.strm_count += len(pending_writes)
+            strm_count = self.strm_count
+        logger.info(
+            "【全量STRM生成】批量生成 %d 个 STRM 文件（%d 个内容未变化），累计 %d 个",
+            len(pending_writes),
+            unchanged,
+            strm_count,
+        )
+        pending_writes.clear()
+
+    def _sync_one_path(self, path: str) -> bool:
+        """
+        生成单个同步目录的 STRM 文件
+        """
+        parts = path.split("#", 1)
+        pan_media_dir = parts[1]
+        target_dir = parts[0].rstrip("/")
+
+        try:
+            fileitem = self._get_file_item(
+                storage="123云盘", path=Path(pan_media_dir)
+            )
+            parent_id = int(fileitem.fileid)
+            logger.info(f"【全量STRM生成】网盘媒体目录 ID 获取成功: {parent_id}")
+        except Exception as e:
+            logger.error(f"【全量STRM生成】网盘媒体目录 ID 获取失败: {e}")
+            return False
+
+        futures = []
+        pending_writes = []
+        skipped = 0
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.download_workers
+            ) as executor:
                 for item in iterdir(
-                    client=self.client, parent_id=parent_id, interval=1, only_file=True
+                    client=self.client,
+                    parent_id=parent_id,
+                    only_file=True,
+                    max_workers=self.list_workers,
+                    limiter=self._limiter,
                 ):
-                    file_path = pan_media_dir + "/" + item["relpath"]
-                    file_path = Path(target_dir) / Path(file_path).relative_to(
-                        pan_media_dir
-                    )
-                    file_target_dir = file_path.parent
-                    original_file_name = file_path.name
-                    file_name = file_path.stem + ".strm"
-                    new_file_path = file_target_dir / file_name
+                    relpath = item["relpath"]
+                    file_path = target_dir + "/" + relpath
+                    file_stem, file_ext = os.path.splitext(file_path)
 
                     if self.auto_download_mediainfo:
-                        if file_path.suffix in self.download_mediaext:
-                            payload = {
-                                "Etag": item["Etag"],
-                                "FileID": int(item["FileId"]),
-                                "FileName": item["FileName"],
-                                "S3KeyFlag": item["S3KeyFlag"],
-                                "Size": int(item["Size"]),
-                            }
-                            resp = self.client.download_info(
-                                payload,
-                                base_url="",
-                                async_=False,
-                                headers={"User-Agent": settings.USER_AGENT},
-                            )
-                            check_response(resp)
-                            download_url = resp["data"]["DownloadUrl"]
-
-                            if not download_url:
-                                logger.error(
-                                    f"【全量STRM生成】{original_file_name} 下载链接获取失败，无法下载该文件"
+                        if file_ext in self.download_mediaext:
+                            futures.append(
+                                executor.submit(
+                                    self.__download_mediainfo, item, file_path
                                 )
-                                continue
-
-                            file_path.parent.mkdir(parents=True, exist_ok=True)
-
-                            with requests.get(
-                                download_url,
-                                stream=True,
-                                timeout=30,
-                                headers={
-                                    "User-Agent": settings.USER_AGENT,
-                                },
-                            ) as response:
-                                response.raise_for_status()
-                                with open(file_path, "wb") as f:
-                                    for chunk in response.iter_content(chunk_size=8192):
-                                        f.write(chunk)
-
-                            logger.info(
-                                f"【全量STRM生成】保存 {original_file_name} 文件成功: {file_path}"
                             )
-                            self.mediainfo_count += 1
                             continue
 
-                    if file_path.suffix not in self.rmt_mediaext:
-                        logger.warn(
-                            "【全量STRM生成】跳过网盘路径: %s",
-                            str(file_path).replace(str(target_dir), "", 1),
-                        )
+                    if file_ext not in self.rmt_mediaext:
+                        logger.debug("【全量STRM生成】跳过网盘路径: %s", "/" + relpath)
+                        skipped += 1
                         continue
 
-                    new_file_path.parent.mkdir(parents=True, exist_ok=True)
+                    strm_url = self._strm_url_tmpl.format(
+                        name=quote(item["FileName"]),
+                        size=item["Size"],
+                        md5=item["Etag"],
+                        s3_key_flag=item["S3KeyFlag"],
+                    )
+
+                    pending_writes.append(
+                        (file_stem + ".strm", strm_url.encode("utf-8"))
+                    )
+                    if len(pending_writes) >= self.write_batch_size:
+                        self.__flush_strm_files(pending_writes)
+
+                self.__flush_strm_files(pending_writes)
 
-                    strm_url = f"{self.server_address}/api/v1/plugin/p123linker/redirect_url?apikey={settings.API_TOKEN}&name={item['FileName']}&size={item['Size']}&md5={item['Etag']}&s3_key_flag={item['S3KeyFlag']}"
+                for future in as_completed(futures):
+                    try:
+                        if future.result():
+                            with self._count_lock:
+                                self.mediainfo_count += 1
+                                mediainfo_count = self.mediainfo_count
+                            if mediainfo_count % 1000 == 0:
+                                logger.info(
+                                    f"【全量STRM生成】已下载 {mediainfo_count} 个元数据..."
+                                )
+                    except Exception as e:
+                        logger.error(f"【全量STRM生成】下载元数据失败: {e}")
+        except Exception as e:
+            logger.error(f"【全量STRM生成】全量生成 STRM 文件失败: {e}")
+            return False
+        if skipped:
+            logger.warn(f"【全量STRM生成】{pan_media_dir} 跳过 {skipped} 个非媒体文件")
+        return True
+
+    def generate_strm_files(self, full_sync_strm_paths):
+        """
+        生成 STRM 文件，多个同步目录并发处理
+        """
+        media_paths = [path for path in full_sync_strm_paths.split("\n") if path]
+        if not media_paths:
+            return True
+        with ThreadPoolExecutor(max_workers=min(8, len(media_paths))) as executor:
+            results = list(executor.map(self._sync_one_path, media_paths))
+        logger.info(
+            f"【全量STRM生成】全量生成 STRM 文件完成，总共生成 {self.strm_count} 个 STRM 文件，下载 {self.mediainfo_count} 个元数据"
+        )
+        return all(results)
+
+
+# 插件配置页面
+_FORM_SCHEMA = [
+    # 账号设置卡片
+    {
+        "component": "VCard",
+        "props": {
+            "variant": "outlined",
+            "class": "mb-3",
+            "color": "grey-lighten-5",
+            "border": "thin",
+        },
+        "content": [
+            {
+                "component": "VCardItem",
+                "content": [
+                    {
+                        "component": "VCardTitle",
+                        "props": {"class": "text-h6"},
+                        "content": [
+                            {
+                                "component": "VIcon",
+                                "props": {
+                                    "icon": "mdi-account-circle",
+                                    "start": True,
+                                    "color": "success",
+                                    "size": "small",
+                                }
+                            },
+                            {"component": "span", "props": {"class": "ml-2"}, "text": "账号设置"},
+                        ]
+                    }
+                ]
+            },
+            {"component": "VDivider"},
+            {
+                "component": "VCardText",
+                "content": [
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "enabled",
+                                            "label": "启用插件",
+                                            "color": "primary",
+                                            "density": "default",
+                                            "hide-details": True,
+                                            "class": "ma-0 pa-0",
+                                            "variant": "flat",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "passport",
+                                            "label": "手机号",
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "success",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "password",
+                                            "label": "密码",
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "success",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "uid",
+                                            "label": "123云盘用户ID",
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "success",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                ],
+            },
+        ],
+    },
+    # 直链设置卡片
+    {
+        "component": "VCard",
+        "props": {
+            "variant": "outlined",
+            "class": "mb-3",
+            "color": "grey-lighten-5",
+            "border": "thin",
+        },
+        "content": [
+            {
+                "component": "VCardItem",
+                "content": [
+                    {
+                        "component": "VCardTitle",
+                        "props": {"class": "text-h6"},
+                        "content": [
+                            {
+                                "component": "VIcon",
+                                "props": {
+                                    "icon": "mdi-link-box",
+                                    "start": True,
+                                    "color": "warning",
+                                    "size": "small",
+                                }
+                            },
+                            {"component": "span", "props": {"class": "ml-2"}, "text": "直链设置"},
+                        ]
+                    }
+                ]
+            },
+            {"component": "VDivider"},
+            {
+                "component": "VCardText",
+                "content": [
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "secret_key",
+                                            "label": "鉴权密钥",
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "warning",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "expire_time",
+                                            "label": "链接有效期(分钟)",
+                                            "type": "number",
+                                            "hint": "默认10年",
+                                            "persistent-hint": True,
+                                            "hide-spin-buttons": True,
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "warning",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "custom_domain",
+                                            "label": "自定义域名",
+                                            "placeholder": "例如：pan.example.com",
+                                            "hint": "默认：https://vip.123pan.cn",
+                                            "persistent-hint": True,
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "warning",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                ],
+            },
+        ],
+    },
+    # 文件类型设置卡片
+    {
+        "component": "VCard",
+        "props": {
+            "variant": "outlined",
+            "class": "mb-3",
+            "color": "grey-lighten-5",
+            "border": "thin",
+        },
+        "content": [
+            {
+                "component": "VCardItem",
+                "content": [
+                    {
+                        "component": "VCardTitle",
+                        "props": {"class": "text-h6"},
+                        "content": [
+                            {
+                                "component": "VIcon",
+                                "props": {
+                                    "icon": "mdi-file-cog",
+                                    "start": True,
+                                    "color": "error",
+                                    "size": "small",
+                                }
+                            },
+                            {"component": "span", "props": {"class": "ml-2"}, "text": "文件类型设置"},
+                        ]
+                    }
+                ]
+            },
+            {"component": "VDivider"},
+            {
+                "component": "VCardText",
+                "content": [
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 6},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "user_rmt_mediaext",
+                                            "label": "媒体文件后缀",
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "error",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 6},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "user_download_mediaext",
+                                            "label": "元数据后缀",
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "error",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                ],
+            },
+        ],
+    },
+    # 同步设置卡片
+    {
+        "component": "VCard",
+        "props": {
+            "variant": "outlined",
+            "color": "grey-lighten-5",
+            "border": "thin",
+        },
+        "content": [
+            {
+                "component": "VCardItem",
+                "content": [
+                    {
+                        "component": "VCardTitle",
+                        "props": {"class": "text-h6"},
+                        "content": [
+                            {
+                                "component": "VIcon",
+                                "props": {
+                                    "icon": "mdi-cloud-sync",
+                                    "start": True,
+                                    "color": "info",
+                                    "size": "small",
+                                }
+                            },
+                            {"component": "span", "props": {"class": "ml-2"}, "text": "同步设置"},
+                        ]
+                    }
+                ]
+            },
+            {"component": "VDivider"},
+            {
+                "component": "VCardText",
+                "content": [
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12},
+                                "content": [
+                                    {
+                                        "component": "VTextarea",
+                                        "props": {
+                                            "model": "full_sync_strm_paths",
+                                            "label": "同步目录",
+                                            "rows": 3,
+                                            
+                                            "hint": "全量扫描，并在对应目录生成STRM。",
+                                            "persistent-hint": True,
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "info",
+                                            "bg-color": "white",
+                                        },
+                                    },
+                                    {
+                                        "component": "VAlert",
+                                        "props": {
+                                            "type": "info",
+                                            "variant": "tonal",
+                                            "density": "compact",
+                                            "class": "mt-2",
+                                        },
+                                        "content": [
+                                            {
+                                                "component": "div",
+                                                "text": "格式：本地路径#网盘路径"
+                                            },
+                                            {
+                                                "component": "div",
+                                                "props": {"class": "mt-1"},
+                                                "text": "示例：/volume1/strm/movies#/媒体库/电影"
+                                            },
+                                        ],
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "props": {"class": "mt-2"},
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "once_full_sync_strm",
+                                            "label": "立刻全量同步",
+                                            "color": "primary",
+                                            "density": "default",
+                                            "hide-details": True,
+                                            "class": "ma-0 pa-0",
+                                            "variant": "flat",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "timing_full_sync_strm",
+                                            "label": "定期全量同步",
+                                            "color": "primary",
+                                            "density": "default",
+                                            "hide-details": True,
+                                            "class": "ma-0 pa-0",
+                                            "variant": "flat",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VCronField",
+                                        "props": {
+                                            "model": "cron_full_sync_strm",
+                                            "label": "全量同步周期",
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "grey-lighten-1",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "full_sync_auto_download_mediainfo_enabled",
+                                            "label": "下载元数据",
+                                            "color": "primary",
+                                            "density": "default",
+                                            "hide-details": True,
+                                            "class": "ma-0 pa-0",
+                                            "variant": "flat",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "props": {"class": "mt-2"},
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "once_incremental_sync",
+                                            "label": "立刻增量同步",
+                                            "color": "primary",
+                                            "density": "default",
+                                            "hide-details": True,
+                                            "class": "ma-0 pa-0",
+                                            "variant": "flat",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "incremental_sync_enabled",
+                                            "label": "启用增量同步",
+                                            "color": "primary",
+                                            "density": "default",
+                                            "hide-details": True,
+                                            "class": "ma-0 pa-0",
+                                            "variant": "flat",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "incremental_sync_interval",
+                                            "label": "增量同步间隔(分钟)",
+                                            "type": "number",
+                                            "hint": "默认30分钟",
+                                            "persistent-hint": True,
+                                            "hide-spin-buttons": True,
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "grey-lighten-1",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "sync_workers",
+                                            "label": "同步并发数",
+                                            "type": "number",
+                                            "hint": "同时处理的文件数，默认16",
+                                            "persistent-hint": True,
+                                            "hide-spin-buttons": True,
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "grey-lighten-1",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "props": {"class": "mt-2"},
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "list_interval",
+                                            "label": "列表请求间隔(秒)",
+                                            "type": "number",
+                                            "hint": "获取文件列表的平均间隔，0为不限制，默认1秒",
+                                            "persistent-hint": True,
+                                            "hide-spin-buttons": True,
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "grey-lighten-1",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "incremental_max_days",
+                                            "label": "增量同步最大间隔(天)",
+                                            "type": "number",
+                                            "hint": "距上次同步超过该天数时改为全量同步，0为不限制，默认7天",
+                                            "persistent-hint": True,
+                                            "hide-spin-buttons": True,
+                                            "variant": "outlined",
+                                            "density": "compact",
+                                            "color": "grey-lighten-1",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                ],
+            },
+        ],
+    },
+]
 
-                    with open(new_file_path, "w", encoding="utf-8") as file:
-                        file.write(strm_url)
-                    self.strm_count += 1
-                    logger.info(
-                        "【全量STRM生成】生成 STRM 文件成功: %s", str(new_file_path)
-                    )
-            except Exception as e:
-                logger.error(f"【全量STRM生成】全量生成 STRM 文件失败: {e}")
-                return False
-        logger.info(
-            f"【全量STRM生成】全量生成 STRM 文件完成，总共生成 {self.strm_count} 个 STRM 文件，下载 {self.mediainfo_count} 个元数据"
-        )
-        return True
+# 插件配置默认值
+_FORM_DEFAULTS = {
+    "enabled": False,
+    "once_full_sync_strm": False,
+    "once_incremental_sync": False,
+    "passport": "",
+    "password": "",
+    "uid": "",
+    "secret_key": "",
+    "expire_time": str(10 * 365 * 24 * 60),  # 10年（分钟）
+    "custom_domain": "https://vip.123pan.cn",
+    "user_rmt_mediaext": "mp4,mkv,ts,iso,rmvb,avi,mov,mpeg,mpg,wmv,3gp,asf,m4v,flv,m2ts,tp,f4v",
+    "user_download_mediaext": "nfo,jpg,jpeg,png,svg,ass,srt,sup,mp3,flac,wav,aac",
+    "timing_full_sync_strm": False,
+    "full_sync_auto_download_mediainfo_enabled": False,
+    "cron_full_sync_strm": "0 */7 * * *",
+    "full_sync_strm_paths": "",
+    "last_sync_time": "0",
+    "incremental_sync_interval": "30",
+    "incremental_sync_enabled": False,
+    "sync_workers": "16",
+    "list_interval": "1",
+    "incremental_max_days": "7",
+}
 
 
 class p123linker(_PluginBase):
@@ -276,84 +1291,36 @@ class p123linker(_PluginBase):
     _uid = None
     _secret_key = None
     _expire_time = 10 * 365 * 24 * 60  # 10年（分钟）
+    _expire_seconds = _expire_time * 60  # 链接有效期（秒），加载配置时计算
     _custom_domain = "https://vip.123pan.cn"
     _last_sync_time = 0  # 上次同步时间戳
+    _last_sync_times = {}  # 各网盘路径上次成功同步的时间戳
     _incremental_sync_interval = 30  # 增量同步间隔（分钟）
     _incremental_sync_enabled = False
-
-    @staticmethod
-    def iterdir(
-        client: P123Client,
-        parent_id: int = 0,
-        interval: int | float = 0,
-        only_file: bool = False,
-    ):
-        """
-        遍历文件列表
-        广度优先搜索
-        return:
-            迭代器
-        Yields:
-            dict: 文件或目录信息（包含路径）
-        """
-        queue = deque()
-        queue.append((parent_id, ""))
-        while queue:
-            current_parent_id, current_path = queue.popleft()
-            page = 1
-            _next = 0
-            while True:
-                payload = {
-                    "limit": 100,
-                    "next": _next,
-                    "Page": page,
-                    "parentFileId": current_parent_id,
-                    "inDirectSpace": "false",
-                }
-                if interval != 0:
-                    time.sleep(interval)
-                resp = client.fs_list(payload)
-                check_response(resp)
-                item_list = resp.get("data").get("InfoList")
-                if not item_list:
-                    break
-                for item in item_list:
-                    is_dir = bool(item["Type"])
-                    item_path = (
-                        f"{current_path}/{item['FileName']}"
-                        if current_path
-                        else item["FileName"]
-                    )
-                    if is_dir:
-                        queue.append((int(item["FileId"]), item_path))
-                    if is_dir and only_file:
-                        continue
-                    if is_dir:
-                        yield {
-                            **item,
-                            "relpath": item_path,
-                            "is_dir": is_dir,
-                            "id": int(item["FileId"]),
-                            "parent_id": int(current_parent_id),
-                            "name": item["FileName"],
-                        }
-                    else:
-                        yield {
-                            **item,
-                            "relpath": item_path,
-                            "is_dir": is_dir,
-                            "id": int(item["FileId"]),
-                            "parent_id": int(current_parent_id),
-                            "name": item["FileName"],
-                            "size": int(item["Size"]),
-                            "md5": item["Etag"],
-                            "uri": f"123://{quote(item['FileName'])}|{int(item['Size'])}|{item['Etag']}?{item['S3KeyFlag']}",
-                        }
-                if resp.get("data").get("Next") == "-1":
-                    break
-                else:
-                    page += 1
-                    _next = resp.get("data").get("Next")
+    _incremental_max_days = 7  # 距上次同步超过该天数时改为全量同步，0 为不限制
+    # 增量同步网盘路径 -> 目录ID缓存，随配置保存
+    _pan_path_id_cache = {}
+    # 增量同步文件ID -> Etag 索引，用于跳过内容未变化的文件
+    _etag_index = {}
+    _tz = None
+    # 网盘目录ID缓存 (父目录ID, 目录名) -> 目录ID
+    _dir_id_cache = None
+    # 元数据下载会话，复用连接
+    _http = None
+    # 同步文件处理线程数（可配置）与待处理文件队列长度
+    _sync_workers = 16
+    _sync_queue_size = 256
+    # 增量同步每处理多少个文件保存一次进度
+    _checkpoint_every = 1000
+    _checkpoint_lock = threading.Lock()
+    # 获取文件列表的平均请求间隔（秒），0 为不限制
+    _list_interval = 1.0
+    # 由配置解析得到的同步目录 (本地路径, 网盘路径, 网盘路径层级) 与文件后缀
+    _parsed_config_key = None
+    _parsed_sync_paths = []
+    _media_exts = frozenset()
+    _data_exts = frozenset()
+    _ext_kind = {}
 
     def init_plugin(self, config: dict = None):
         """
@@ -362,35 +1329,60 @@ class p123linker(_PluginBase):
         logger.info("【123云盘直链】开始初始化插件...")
         
         self._storagechain = StorageChain()
+        self._tz = pytz.timezone(settings.TZ)
+        self._dir_id_cache = TTLCache(maxsize=1024, ttl=3600)
         # 设置默认值：链接有效期10年，默认域名vip.123pan.cn
         self._expire_time = 10 * 365 * 24 * 60  # 10年（分钟）
+        self._expire_seconds = self._expire_time * 60
         self._custom_domain = "https://vip.123pan.cn"
         self._last_sync_time = int(time.time())  # 初始化为当前时间
+        self._last_sync_times = {}
+        self._pan_path_id_cache = {}
+        self._etag_index = self.get_data("etag_index") or {}
+        self._sync_workers = 16
+        self._list_interval = 1.0
+        self._incremental_max_days = 7
         self._incremental_sync_interval = 30  # 增量同步间隔（分钟）
         self._once_incremental_sync = False  # 立刻增量同步
 
         if config:
             logger.info("【123云盘直链】加载配置...")
-            self._enabled = config.get("enabled")
-            self._once_full_sync_strm = config.get("once_full_sync_strm")
-            self._once_incremental_sync = config.get("once_incremental_sync")
-            self._passport = config.get("passport")
-            self._password = config.get("password")
-            self._uid = config.get("uid")
-            self._secret_key = config.get("secret_key")
-            self._expire_time = int(config.get("expire_time") or 10 * 365 * 24 * 60)
-            self._custom_domain = config.get("custom_domain") or "https://vip.123pan.cn"
-            self._user_rmt_mediaext = config.get("user_rmt_mediaext")
-            self._user_download_mediaext = config.get("user_download_mediaext")
-            self._timing_full_sync_strm = config.get("timing_full_sync_strm")
-            self._full_sync_auto_download_mediainfo_enabled = config.get("full_sync_auto_download_mediainfo_enabled")
-            self._cron_full_sync_strm = config.get("cron_full_sync_strm")
-            self._full_sync_strm_paths = config.get("full_sync_strm_paths")
+            get = config.get
+            self._enabled = get("enabled")
+            self._once_full_sync_strm = get("once_full_sync_strm")
+            self._once_incremental_sync = get("once_incremental_sync")
+            self._passport = get("passport")
+            self._password = get("password")
+            self._uid = get("uid")
+            self._secret_key = get("secret_key")
+            self._expire_time = int(get("expire_time") or 10 * 365 * 24 * 60)
+            self._expire_seconds = self._expire_time * 60
+            self._custom_domain = get("custom_domain") or "https://vip.123pan.cn"
+            self._user_rmt_mediaext = get("user_rmt_mediaext")
+            self._user_download_mediaext = get("user_download_mediaext")
+            self._timing_full_sync_strm = get("timing_full_sync_strm")
+            self._full_sync_auto_download_mediainfo_enabled = get("full_sync_auto_download_mediainfo_enabled")
+            self._cron_full_sync_strm = get("cron_full_sync_strm")
+            self._full_sync_strm_paths = get("full_sync_strm_paths")
             # 如果配置中有上次同步时间则使用，否则使用当前时间
-            saved_time = config.get("last_sync_time")
+            saved_time = get("last_sync_time")
             self._last_sync_time = int(saved_time) if saved_time else int(time.time())
-            self._incremental_sync_interval = int(config.get("incremental_sync_interval") or 30)
-            self._incremental_sync_enabled = config.get("incremental_sync_enabled") or False
+            self._last_sync_times = dict(get("last_sync_times") or {})
+            self._incremental_sync_interval = int(get("incremental_sync_interval") or 30)
+            self._incremental_sync_enabled = get("incremental_sync_enabled") or False
+            self._pan_path_id_cache = dict(get("pan_path_id_cache") or {})
+            # 目录ID只对缓存时的账号有效，更换账号后重新查找
+            if get("pan_path_id_cache_passport") != self._passport:
+                self._pan_path_id_cache = {}
+            self._sync_workers = max(1, int(get("sync_workers") or 16))
+            max_days = get("incremental_max_days")
+            self._incremental_max_days = (
+                max(0, int(max_days)) if max_days not in (None, "") else 7
+            )
+            list_interval = get("list_interval")
+            self._list_interval = (
+                max(0.0, float(list_interval)) if list_interval not in (None, "") else 1.0
+            )
 
             if not self._user_rmt_mediaext:
                 self._user_rmt_mediaext = "mp4,mkv,ts,iso,rmvb,avi,mov,mpeg,mpg,wmv,3gp,asf,m4v,flv,m2ts,tp,f4v"
@@ -415,13 +1407,22 @@ class p123linker(_PluginBase):
         # 停止现有任务
         self.stop_service()
 
+        # 元数据下载会话，连接池大小与同步线程数一致
+        self._http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self._sync_workers, pool_maxsize=self._sync_workers
+        )
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+
         if self._enabled and self._once_full_sync_strm:
             logger.info("【123云盘直链】准备执行立即全量同步...")
-            self._scheduler = BackgroundScheduler(timezone=settings.TZ)
+            self._scheduler = BackgroundScheduler(timezone=self._tz)
             self._scheduler.add_job(
                 func=self.full_sync_strm_files,
+                kwargs={"force": True},
                 trigger="date",
-                run_date=datetime.now(tz=pytz.timezone(settings.TZ))
+                run_date=datetime.now(tz=self._tz)
                 + timedelta(seconds=3),
                 name="123云盘助手立刻全量同步",
             )
@@ -434,11 +1435,11 @@ class p123linker(_PluginBase):
 
         if self._enabled and self._once_incremental_sync:
             logger.info("【123云盘直链】准备执行立即增量同步...")
-            self._scheduler = BackgroundScheduler(timezone=settings.TZ)
+            self._scheduler = BackgroundScheduler(timezone=self._tz)
             self._scheduler.add_job(
                 func=self.incremental_sync_files,
                 trigger="date",
-                run_date=datetime.now(tz=pytz.timezone(settings.TZ))
+                run_date=datetime.now(tz=self._tz)
                 + timedelta(seconds=3),
                 name="123云盘助手立刻增量同步",
             )
@@ -464,587 +1465,61 @@ class p123linker(_PluginBase):
         """
         return []
 
-    def get_service(self) -> List[Dict[str, Any]]:
-        """
-        注册插件公共服务
-        """
-        cron_service = []
-        
-        # 定期全量同步
-        if (
-            self._cron_full_sync_strm
-            and self._timing_full_sync_strm
-            and self._full_sync_strm_paths
-        ):
-            cron_service.append(
-                {
-                    "id": "p123linker_full_sync_strm_files",
-                    "name": "定期全量同步123媒体库",
-                    "trigger": CronTrigger.from_crontab(self._cron_full_sync_strm),
-                    "func": self.full_sync_strm_files,
-                    "kwargs": {},
-                }
-            )
-            
-        # 增量同步
-        if self._incremental_sync_enabled and self._full_sync_strm_paths:
-            try:
-                interval = max(1, int(self._incremental_sync_interval))
-                cron_service.append(
-                    {
-                        "id": "p123linker_incremental_sync",
-                        "name": "增量同步123媒体库",
-                        "trigger": CronTrigger(
-                            minute=f"*/{interval}"
-                        ),
-                        "func": self.incremental_sync_files,
-                        "kwargs": {},
-                    }
-                )
-                logger.info(f"【123云盘直链】增量同步已启用，间隔{interval}分钟")
-            except Exception as e:
-                logger.error(f"【123云盘直链】增量同步配置错误: {e}")
-            
-        if cron_service:
-            return cron_service
-
-    def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
-        """
-        拼装插件配置页面，需要返回两块数据：1、页面配置；2、数据结构
-        """
-        return [
-            # 账号设置卡片
-            {
-                "component": "VCard",
-                "props": {
-                    "variant": "outlined",
-                    "class": "mb-3",
-                    "color": "grey-lighten-5",
-                    "border": "thin",
-                },
-                "content": [
-                    {
-                        "component": "VCardItem",
-                        "content": [
-                            {
-                                "component": "VCardTitle",
-                                "props": {"class": "text-h6"},
-                                "content": [
-                                    {
-                                        "component": "VIcon",
-                                        "props": {
-                                            "icon": "mdi-account-circle",
-                                            "start": True,
-                                            "color": "success",
-                                            "size": "small",
-                                        }
-                                    },
-                                    {"component": "span", "props": {"class": "ml-2"}, "text": "账号设置"},
-                                ]
-                            }
-                        ]
-                    },
-                    {"component": "VDivider"},
-                    {
-                        "component": "VCardText",
-                        "content": [
-                            {
-                                "component": "VRow",
-                                "content": [
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 3},
-                                        "content": [
-                                            {
-                                                "component": "VSwitch",
-                                                "props": {
-                                                    "model": "enabled",
-                                                    "label": "启用插件",
-                                                    "color": "primary",
-                                                    "density": "default",
-                                                    "hide-details": True,
-                                                    "class": "ma-0 pa-0",
-                                                    "variant": "flat",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 3},
-                                        "content": [
-                                            {
-                                                "component": "VTextField",
-                                                "props": {
-                                                    "model": "passport",
-                                                    "label": "手机号",
-                                                    "variant": "outlined",
-                                                    "density": "compact",
-                                                    "color": "success",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 3},
-                                        "content": [
-                                            {
-                                                "component": "VTextField",
-                                                "props": {
-                                                    "model": "password",
-                                                    "label": "密码",
-                                                    "variant": "outlined",
-                                                    "density": "compact",
-                                                    "color": "success",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 3},
-                                        "content": [
-                                            {
-                                                "component": "VTextField",
-                                                "props": {
-                                                    "model": "uid",
-                                                    "label": "123云盘用户ID",
-                                                    "variant": "outlined",
-                                                    "density": "compact",
-                                                    "color": "success",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                ],
-                            },
-                        ],
-                    },
-                ],
-            },
-            # 直链设置卡片
-            {
-                "component": "VCard",
-                "props": {
-                    "variant": "outlined",
-                    "class": "mb-3",
-                    "color": "grey-lighten-5",
-                    "border": "thin",
-                },
-                "content": [
-                    {
-                        "component": "VCardItem",
-                        "content": [
-                            {
-                                "component": "VCardTitle",
-                                "props": {"class": "text-h6"},
-                                "content": [
-                                    {
-                                        "component": "VIcon",
-                                        "props": {
-                                            "icon": "mdi-link-box",
-                                            "start": True,
-                                            "color": "warning",
-                                            "size": "small",
-                                        }
-                                    },
-                                    {"component": "span", "props": {"class": "ml-2"}, "text": "直链设置"},
-                                ]
-                            }
-                        ]
-                    },
-                    {"component": "VDivider"},
-                    {
-                        "component": "VCardText",
-                        "content": [
-                            {
-                                "component": "VRow",
-                                "content": [
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 4},
-                                        "content": [
-                                            {
-                                                "component": "VTextField",
-                                                "props": {
-                                                    "model": "secret_key",
-                                                    "label": "鉴权密钥",
-                                                    "variant": "outlined",
-                                                    "density": "compact",
-                                                    "color": "warning",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 4},
-                                        "content": [
-                                            {
-                                                "component": "VTextField",
-                                                "props": {
-                                                    "model": "expire_time",
-                                                    "label": "链接有效期(分钟)",
-                                                    "type": "number",
-                                                    "hint": "默认10年",
-                                                    "persistent-hint": True,
-                                                    "hide-spin-buttons": True,
-                                                    "variant": "outlined",
-                                                    "density": "compact",
-                                                    "color": "warning",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 4},
-                                        "content": [
-                                            {
-                                                "component": "VTextField",
-                                                "props": {
-                                                    "model": "custom_domain",
-                                                    "label": "自定义域名",
-                                                    "placeholder": "例如：pan.example.com",
-                                                    "hint": "默认：https://vip.123pan.cn",
-                                                    "persistent-hint": True,
-                                                    "variant": "outlined",
-                                                    "density": "compact",
-                                                    "color": "warning",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                ],
-                            },
-                        ],
-                    },
-                ],
-            },
-            # 文件类型设置卡片
-            {
-                "component": "VCard",
-                "props": {
-                    "variant": "outlined",
-                    "class": "mb-3",
-                    "color": "grey-lighten-5",
-                    "border": "thin",
-                },
-                "content": [
-                    {
-                        "component": "VCardItem",
-                        "content": [
-                            {
-                                "component": "VCardTitle",
-                                "props": {"class": "text-h6"},
-                                "content": [
-                                    {
-                                        "component": "VIcon",
-                                        "props": {
-                                            "icon": "mdi-file-cog",
-                                            "start": True,
-                                            "color": "error",
-                                            "size": "small",
-                                        }
-                                    },
-                                    {"component": "span", "props": {"class": "ml-2"}, "text": "文件类型设置"},
-                                ]
-                            }
-                        ]
-                    },
-                    {"component": "VDivider"},
-                    {
-                        "component": "VCardText",
-                        "content": [
-                            {
-                                "component": "VRow",
-                                "content": [
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 6},
-                                        "content": [
-                                            {
-                                                "component": "VTextField",
-                                                "props": {
-                                                    "model": "user_rmt_mediaext",
-                                                    "label": "媒体文件后缀",
-                                                    "variant": "outlined",
-                                                    "density": "compact",
-                                                    "color": "error",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 6},
-                                        "content": [
-                                            {
-                                                "component": "VTextField",
-                                                "props": {
-                                                    "model": "user_download_mediaext",
-                                                    "label": "元数据后缀",
-                                                    "variant": "outlined",
-                                                    "density": "compact",
-                                                    "color": "error",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                ],
-                            },
-                        ],
-                    },
-                ],
-            },
-            # 同步设置卡片
-            {
-                "component": "VCard",
-                "props": {
-                    "variant": "outlined",
-                    "color": "grey-lighten-5",
-                    "border": "thin",
-                },
-                "content": [
-                    {
-                        "component": "VCardItem",
-                        "content": [
-                            {
-                                "component": "VCardTitle",
-                                "props": {"class": "text-h6"},
-                                "content": [
-                                    {
-                                        "component": "VIcon",
-                                        "props": {
-                                            "icon": "mdi-cloud-sync",
-                                            "start": True,
-                                            "color": "info",
-                                            "size": "small",
-                                        }
-                                    },
-                                    {"component": "span", "props": {"class": "ml-2"}, "text": "同步设置"},
-                                ]
-                            }
-                        ]
-                    },
-                    {"component": "VDivider"},
+    def get_service(self) -> List[Dict[str, Any]]:
+        """
+        注册插件公共服务
+        """
+        cron_service = []
+        
+        # 定期全量同步
+        if (
+            self._cron_full_sync_strm
+            and self._timing_full_sync_strm
+            and self._full_sync_strm_paths
+        ):
+            cron_service.append(
+                {
+                    "id": "p123linker_full_sync_strm_files",
+                    "name": "定期全量同步123媒体库",
+                    "trigger": CronTrigger.from_crontab(self._cron_full_sync_strm),
+                    "func": self.full_sync_strm_files,
+                    "kwargs": {},
+                }
+            )
+            
+        # 增量同步
+        if self._incremental_sync_enabled and self._full_sync_strm_paths:
+            try:
+                interval = max(1, int(self._incremental_sync_interval))
+                cron_service.append(
                     {
-                        "component": "VCardText",
-                        "content": [
-                            {
-                                "component": "VRow",
-                                "content": [
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12},
-                                        "content": [
-                                            {
-                                                "component": "VTextarea",
-                                                "props": {
-                                                    "model": "full_sync_strm_paths",
-                                                    "label": "同步目录",
-                                                    "rows": 3,
-                                                    
-                                                    "hint": "全量扫描，并在对应目录生成STRM。",
-                                                    "persistent-hint": True,
-                                                    "variant": "outlined",
-                                                    "density": "compact",
-                                                    "color": "info",
-                                                    "bg-color": "white",
-                                                },
-                                            },
-                                            {
-                                                "component": "VAlert",
-                                                "props": {
-                                                    "type": "info",
-                                                    "variant": "tonal",
-                                                    "density": "compact",
-                                                    "class": "mt-2",
-                                                },
-                                                "content": [
-                                                    {
-                                                        "component": "div",
-                                                        "text": "格式：本地路径#网盘路径"
-                                                    },
-                                                    {
-                                                        "component": "div",
-                                                        "props": {"class": "mt-1"},
-                                                        "text": "示例：/volume1/strm/movies#/媒体库/电影"
-                                                    },
-                                                ],
-                                            }
-                                        ],
-                                    },
-                                ],
-                            },
-                            {
-                                "component": "VRow",
-                                "props": {"class": "mt-2"},
-                                "content": [
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 3},
-                                        "content": [
-                                            {
-                                                "component": "VSwitch",
-                                                "props": {
-                                                    "model": "once_full_sync_strm",
-                                                    "label": "立刻全量同步",
-                                                    "color": "primary",
-                                                    "density": "default",
-                                                    "hide-details": True,
-                                                    "class": "ma-0 pa-0",
-                                                    "variant": "flat",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 3},
-                                        "content": [
-                                            {
-                                                "component": "VSwitch",
-                                                "props": {
-                                                    "model": "timing_full_sync_strm",
-                                                    "label": "定期全量同步",
-                                                    "color": "primary",
-                                                    "density": "default",
-                                                    "hide-details": True,
-                                                    "class": "ma-0 pa-0",
-                                                    "variant": "flat",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 3},
-                                        "content": [
-                                            {
-                                                "component": "VCronField",
-                                                "props": {
-                                                    "model": "cron_full_sync_strm",
-                                                    "label": "全量同步周期",
-                                                    "variant": "outlined",
-                                                    "density": "compact",
-                                                    "color": "grey-lighten-1",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 3},
-                                        "content": [
-                                            {
-                                                "component": "VSwitch",
-                                                "props": {
-                                                    "model": "full_sync_auto_download_mediainfo_enabled",
-                                                    "label": "下载元数据",
-                                                    "color": "primary",
-                                                    "density": "default",
-                                                    "hide-details": True,
-                                                    "class": "ma-0 pa-0",
-                                                    "variant": "flat",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                ],
-                            },
-                            {
-                                "component": "VRow",
-                                "props": {"class": "mt-2"},
-                                "content": [
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 3},
-                                        "content": [
-                                            {
-                                                "component": "VSwitch",
-                                                "props": {
-                                                    "model": "once_incremental_sync",
-                                                    "label": "立刻增量同步",
-                                                    "color": "primary",
-                                                    "density": "default",
-                                                    "hide-details": True,
-                                                    "class": "ma-0 pa-0",
-                                                    "variant": "flat",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 3},
-                                        "content": [
-                                            {
-                                                "component": "VSwitch",
-                                                "props": {
-                                                    "model": "incremental_sync_enabled",
-                                                    "label": "启用增量同步",
-                                                    "color": "primary",
-                                                    "density": "default",
-                                                    "hide-details": True,
-                                                    "class": "ma-0 pa-0",
-                                                    "variant": "flat",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                    {
-                                        "component": "VCol",
-                                        "props": {"cols": 12, "md": 3},
-                                        "content": [
-                                            {
-                                                "component": "VTextField",
-                                                "props": {
-                                                    "model": "incremental_sync_interval",
-                                                    "label": "增量同步间隔(分钟)",
-                                                    "type": "number",
-                                                    "hint": "默认30分钟",
-                                                    "persistent-hint": True,
-                                                    "hide-spin-buttons": True,
-                                                    "variant": "outlined",
-                                                    "density": "compact",
-                                                    "color": "grey-lighten-1",
-                                                },
-                                            }
-                                        ],
-                                    },
-                                ],
-                            },
-                        ],
-                    },
-                ],
-            },
-        ], {
-            "enabled": False,
-            "once_full_sync_strm": False,
-            "once_incremental_sync": False,
-            "passport": "",
-            "password": "",
-            "uid": "",
-            "secret_key": "",
-            "expire_time": str(10 * 365 * 24 * 60),  # 10年（分钟）
-            "custom_domain": "https://vip.123pan.cn",
-            "user_rmt_mediaext": "mp4,mkv,ts,iso,rmvb,avi,mov,mpeg,mpg,wmv,3gp,asf,m4v,flv,m2ts,tp,f4v",
-            "user_download_mediaext": "nfo,jpg,jpeg,png,svg,ass,srt,sup,mp3,flac,wav,aac",
-            "timing_full_sync_strm": False,
-            "full_sync_auto_download_mediainfo_enabled": False,
-            "cron_full_sync_strm": "0 */7 * * *",
-            "full_sync_strm_paths": "",
-            "last_sync_time": "0",
-            "incremental_sync_interval": "30",
-            "incremental_sync_enabled": False,
-        }
+                        "id": "p123linker_incremental_sync",
+                        "name": "增量同步123媒体库",
+                        "trigger": CronTrigger(
+                            minute=f"*/{interval}"
+                        ),
+                        "func": self.incremental_sync_files,
+                        "kwargs": {},
+                    }
+                )
+                logger.info(f"【123云盘直链】增量同步已启用，间隔{interval}分钟")
+            except Exception as e:
+                logger.error(f"【123云盘直链】增量同步配置错误: {e}")
+            
+        if cron_service:
+            return cron_service
+
+    def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
+        """
+        拼装插件配置页面，需要返回两块数据：1、页面配置；2、数据结构
+        """
+        return _FORM_SCHEMA, dict(_FORM_DEFAULTS)
 
     def get_page(self) -> List[dict]:
         pass
 
     def __update_config(self):
+        self.__parse_sync_config()
         self.update_config(
             {
                 "enabled": self._enabled,
@@ -1063,8 +1538,14 @@ class p123linker(_PluginBase):
                 "cron_full_sync_strm": self._cron_full_sync_strm,
                 "full_sync_strm_paths": self._full_sync_strm_paths,
                 "last_sync_time": str(self._last_sync_time),
+                "last_sync_times": self._last_sync_times,
                 "incremental_sync_interval": str(self._incremental_sync_interval),
                 "incremental_sync_enabled": self._incremental_sync_enabled,
+                "pan_path_id_cache": self._pan_path_id_cache,
+                "pan_path_id_cache_passport": self._passport,
+                "sync_workers": str(self._sync_workers),
+                "list_interval": str(self._list_interval),
+                "incremental_max_days": str(self._incremental_max_days),
             }
         )
 
@@ -1080,31 +1561,107 @@ class p123linker(_PluginBase):
             return False
         return True
 
-    def has_prefix(self, full_path, prefix_path):
+    def __parse_sync_config(self):
         """
-        判断路径是否包含
+        解析同步目录和文件后缀配置，配置未变化时不重复解析
         """
-        full = Path(full_path).parts
-        prefix = Path(prefix_path).parts
+        config_key = (
+            self._full_sync_strm_paths,
+            self._user_rmt_mediaext,
+            self._user_download_mediaext,
+        )
+        if config_key == self._parsed_config_key:
+            return
+        self._parsed_config_key = config_key
 
-        if len(prefix) > len(full):
-            return False
+        parsed_sync_paths = []
+        for path in (self._full_sync_strm_paths or "").strip().split("\n"):
+            if not path.strip():
+                continue
+            parts = path.split("#", 1)
+            if len(parts) != 2:
+                logger.error(f"【123云盘直链】同步路径格式错误: {path}")
+                continue
+            local_path, pan_path = parts
+            # 移除开头和结尾的斜杠，然后分割
+            pan_path = pan_path.strip("/")
+            pan_path_parts = tuple(part for part in pan_path.split("/") if part)
+            parsed_sync_paths.append((local_path, pan_path, pan_path_parts))
+        self._parsed_sync_paths = parsed_sync_paths
+
+        self._media_exts = frozenset(
+            f".{ext.strip().lower()}"
+            for ext in (self._user_rmt_mediaext or "").split(",")
+        )
+        self._data_exts = frozenset(
+            f".{ext.strip().lower()}"
+            for ext in (self._user_download_mediaext or "").split(",")
+        )
+        # 后缀 -> 文件类型，媒体文件优先于数据文件
+        ext_kind = dict.fromkeys(self._data_exts, "data")
+        ext_kind.update(dict.fromkeys(self._media_exts, "media"))
+        self._ext_kind = ext_kind
 
-        return full[: len(prefix)] == prefix
+    def has_prefix(self, full_path, prefix_path):
+        """
+        判断路径是否包含
+        """
+        full = os.path.normpath(full_path)
+        prefix = os.path.normpath(prefix_path).rstrip(os.sep)
+        return full == prefix or full.startswith(prefix + os.sep)
 
-    def __get_media_path(self, paths, media_path):
+    def __get_media_path(self, media_path):
         """
         获取媒体目录路径
         """
-        media_paths = paths.split("\n")
-        for path in media_paths:
-            if not path:
-                continue
-            parts = path.split("#", 1)
-            if self.has_prefix(media_path, parts[1]):
-                return True, parts[0], parts[1]
+        media_path = os.path.normpath(media_path)
+        for local_path, pan_path, _ in self._parsed_sync_paths:
+            pan_path = f"/{pan_path}"
+            if self.has_prefix(media_path, pan_path):
+                return True, local_path, pan_path
         return False, None, None
 
+    def _auth_context(self) -> Tuple[str, str, int, Any, bytes]:
+        """
+        直链签名的不变参数：域名、用户ID、有效期（秒）、
+        已写入请求路径前缀 /uid/ 的MD5对象、待签名字符串后缀 -uid-密钥
+        同步任务开始时计算一次，供每个文件复用
+        """
+        domain = self._custom_domain.rstrip('/')
+        if not domain.startswith(('http://', 'https://')):
+            domain = f"https://{domain}"
+        uid = str(self._uid)
+        md5_base = _md5(f"/{uid}/".encode(), usedforsecurity=False)
+        sign_suffix = f"-{uid}-{self._secret_key}".encode()
+        return domain, uid, self._expire_seconds, md5_base, sign_suffix
+
+    @staticmethod
+    def _auth_url_fast(
+        path: str,
+        domain: str,
+        uid: str,
+        expire_secs: int,
+        md5_base,
+        sign_suffix: bytes,
+        now: int,
+    ) -> str:
+        """
+        使用预先计算的参数生成带签名的直链
+        path 为未编码的网盘路径，不以斜杠开头
+        """
+        # 生成过期时间戳
+        expire_time = now + expire_secs
+        # 生成随机数
+        rand = _rand31()
+        # 计算MD5签名，待签名字符串的顺序和格式必须和Go示例完全一致：
+        # /uid/path-timestamp-random-uid-secret
+        sign_hash = md5_base.copy()
+        sign_hash.update(f"{path}-{expire_time}-{rand}".encode())
+        sign_hash.update(sign_suffix)
+        sign = sign_hash.hexdigest()
+        # 构建auth_key（格式：timestamp-random-uid-sign）
+        return f"{domain}/{uid}/{path}?auth_key={expire_time}-{rand}-{uid}-{sign}"
+
     def _generate_auth_url(self, file_path: str) -> str:
         """
         生成带签名的123云盘直链
@@ -1112,8 +1669,6 @@ class p123linker(_PluginBase):
         authKey := fmt.Sprintf("%d-%d-%d-%x", ts, rInt, uid, md5.Sum([]byte(fmt.Sprintf("%s-%d-%d-%d-%s",
             objURL.Path, ts, rInt, uid, privateKey))))
         """
-        logger.info("【直链生成】开始生成直链...")
-        
         if not self._uid or not self._secret_key:
             logger.error("【直链生成】缺少必要的配置：用户ID或鉴权密钥")
             logger.debug(f"【直链生成】当前配置：UID={self._uid}, 密钥长度={len(self._secret_key) if self._secret_key else 0}")
@@ -1123,51 +1678,201 @@ class p123linker(_PluginBase):
             logger.error("【直链生成】未配置自定义域名")
             raise ValueError("未配置自定义域名")
 
-        logger.info(f"【直链生成】文件路径: {file_path}")
-        
         try:
-            # 生成过期时间戳
-            expire_time = int(time.time()) + self._expire_time * 60
-            # 生成随机数
-            rand = random.randint(0, 2**31-1)  # 使用和Go一样的随机数范围
-            
-            # 构建请求路径
-            request_path = f"/{self._uid}/{file_path}"
             # URL解码路径
-            request_path = unquote(request_path)
-            logger.debug(f"【直链生成】请求路径: {request_path}")
-            
-            # 构建待签名字符串（注意顺序和格式必须和Go示例完全一致）
-            sign_str = f"{request_path}-{expire_time}-{rand}-{self._uid}-{self._secret_key}"
-            logger.debug(f"【直链生成】待签名字符串: {sign_str}")
-            
-            # 计算MD5签名（使用二进制格式）
-            sign = hashlib.md5(sign_str.encode()).hexdigest()
-            logger.debug(f"【直链生成】MD5签名: {sign}")
+            final_url = self._auth_url_fast(
+                unquote(file_path), *self._auth_context(), int(time.time())
+            )
+            logger.debug("【直链生成】生成直链成功: %s", final_url)
+            return final_url
             
-            # 构建auth_key（格式：timestamp-random-uid-sign）
-            auth_key = f"{expire_time}-{rand}-{self._uid}-{sign}"
+        except Exception as e:
+            logger.error(f"【直链生成】生成直链过程中发生错误: {str(e)}")
+            raise
+
+    def _resolve_pan_paths(self, pan_paths: List[Tuple[str, tuple]]) -> Dict[str, int]:
+        """
+        批量解析网盘路径的目录ID，按层级由浅到深查找，共同的上级目录只查找一次
+        pan_paths 为 (网盘路径, 网盘路径层级) 列表，未找到的路径不包含在结果中
+        """
+        prefixes = {parts[:i] for _, parts in pan_paths for i in range(1, len(parts) + 1)}
+        dir_ids = {(): 0}
+        for prefix in sorted(prefixes, key=len):
+            parent_id = dir_ids.get(prefix[:-1])
+            if parent_id is None:
+                continue
+            try:
+                dir_ids[prefix] = self._resolve_child(parent_id, prefix[-1])
+            except Exception as e:
+                logger.error(f"【123云盘直链】查找目录 /{'/'.join(prefix)} 失败: {e}")
+        return {
+            pan_path: dir_ids[parts] for pan_path, parts in pan_paths if parts in dir_ids
+        }
+
+    @staticmethod
+    def _strm_up_to_date(strm_path: str, path: str, auth_context: tuple, now: int) -> bool:
+        """
+        判断已有STRM是否指向相同路径、签名与当前密钥一致，且直链剩余有效期超过一半
+        """
+        domain, uid, expire_secs, md5_base, sign_suffix = auth_context
+        try:
+            with open(strm_path, "rb") as f:
+                content = f.read().decode("utf-8")
+        except (OSError, UnicodeDecodeError):
+            return False
+        prefix = f"{domain}/{uid}/{path}?auth_key="
+        if not content.startswith(prefix):
+            return False
+        # auth_key 格式：timestamp-random-uid-sign
+        auth_key = content[len(prefix):].split("-")
+        if len(auth_key) != 4 or auth_key[2] != uid:
+            return False
+        expire_time, rand, _, sign = auth_key
+        if not expire_time.isdigit() or int(expire_time) <= now + expire_secs // 2:
+            return False
+        # 密钥变更后旧签名失效，需要重新生成
+        sign_hash = md5_base.copy()
+        sign_hash.update(f"{path}-{expire_time}-{rand}".encode())
+        sign_hash.update(sign_suffix)
+        return sign_hash.hexdigest() == sign
+
+    def _resolve_child(self, parent_id: int, name: str) -> int:
+        """
+        获取子目录ID，分页查找并缓存结果
+        """
+        key = (parent_id, name)
+        dir_id = self._dir_id_cache.get(key)
+        if dir_id is not None:
+            return dir_id
+        for item_list in _list_dir(self._client, parent_id):
+            for item in item_list:
+                if item["FileName"] == name and bool(item["Type"]):  # Type=1 表示目录
+                    dir_id = int(item["FileId"])
+                    self._dir_id_cache[key] = dir_id
+                    return dir_id
+        raise ValueError(f"未找到目录: {name}")
+
+    def __run_pipeline(self, items, handler, log_prefix: str, checkpoint=None) -> dict:
+        """
+        生产者线程遍历文件放入有界队列，工作线程并发处理，返回按处理结果的计数
+        checkpoint 不为空时，每处理 _checkpoint_every 个文件调用一次以保存进度
+        """
+        workers = self._sync_workers
+        q = queue.Queue(maxsize=self._sync_queue_size)
+        errors = []
+        processed = count(1)
+
+        def produce():
+            try:
+                for item in items:
+                    q.put(item)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                for _ in range(workers):
+                    q.put(None)
+
+        def consume():
+            counts = defaultdict(int)
+            while (item := q.get()) is not None:
+                try:
+                    result = handler(item)
+                except Exception as e:
+                    logger.error("%s处理文件失败: %s", log_prefix, e)
+                    result = "failed"
+                if result:
+                    counts[result] += 1
+                if checkpoint and next(processed) % self._checkpoint_every == 0:
+                    try:
+                        checkpoint()
+                    except Exception as e:
+                        logger.error("%s保存同步进度失败: %s", log_prefix, e)
+            return counts
+
+        stats = defaultdict(int)
+        with ThreadPoolExecutor(max_workers=workers + 1) as executor:
+            executor.submit(produce)
+            for future in [executor.submit(consume) for _ in range(workers)]:
+                for result, num in future.result().items():
+                    stats[result] += num
+        if errors:
+            raise errors[0]
+        return stats
+
+    def _process_full_sync_item(
+        self,
+        item: dict,
+        pan_path: str,
+        local_path: str,
+        ext_kind: dict,
+        auth_context: tuple,
+        created_dirs: set,
+        force: bool = False,
+    ):
+        """
+        全量同步单个文件：生成STRM或下载元数据
+        created_dirs 记录本次同步已创建的目录，force 为 False 时跳过未变化的文件
+        返回处理结果：strm、data、exists 或 skip
+        """
+        # 检查文件扩展名
+        file_name = item["FileName"]
+        kind = ext_kind.get(os.path.splitext(file_name)[1].lower())
+        
+        # 构建本地路径，relpath 为相对于网盘同步目录的 posix 路径
+        relpath = item["relpath"]
+        file_path = os.path.join(local_path, relpath)
+        file_target_dir = os.path.dirname(file_path)
+        if file_target_dir not in created_dirs:
+            os.makedirs(file_target_dir, exist_ok=True)
+            created_dirs.add(file_target_dir)
+        
+        if kind == "media":
+            # 为媒体文件生成STRM
+            new_file_path = os.path.splitext(file_path)[0] + ".strm"
             
-            # 构建基础URL
-            domain = self._custom_domain.rstrip('/')
-            if not domain.startswith(('http://', 'https://')):
-                domain = f"https://{domain}"
+            # 构建完整的文件路径，确保不以斜杠开头
+            full_path = f"{pan_path}/{relpath}".strip('/')
+            now = int(time.time())
+            if not force and self._strm_up_to_date(new_file_path, full_path, auth_context, now):
+                return "exists"
+            # 直链使用未编码的路径签名，无需先编码再解码
+            url = self._auth_url_fast(full_path, *auth_context, now)
             
-            base_url = f"{domain}{request_path}"
+            _write_strm(new_file_path, url.encode("utf-8"))
+            return "strm"
             
-            # 添加auth_key参数
-            final_url = f"{base_url}?auth_key={auth_key}"
-            logger.info(f"【直链生成】生成直链成功: {final_url}")
+        elif kind == "data" and self._full_sync_auto_download_mediainfo_enabled:
+            # 下载元数据
+            new_file_path = file_path
+            if not force:
+                try:
+                    if os.stat(new_file_path).st_size == int(item["Size"]):
+                        return "exists"
+                except OSError:
+                    pass
             
-            return final_url
+            # 获取下载链接
+            resp = self._client.download_info(_download_info_payload(item))
+            check_response(resp)
+            download_url = resp["data"]["DownloadUrl"]
             
-        except Exception as e:
-            logger.error(f"【直链生成】生成直链过程中发生错误: {str(e)}")
-            raise
+            # 下载文件
+            with self._http.get(download_url, stream=True, timeout=(5, 60)) as r:
+                r.raise_for_status()
+                r.raw.decode_content = True
+                with open(new_file_path, 'wb') as f:
+                    shutil.copyfileobj(r.raw, f, length=1024 * 1024)
+                        
+            logger.debug("【全量同步】下载元数据成功: %s", new_file_path)
+            return "data"
+
+        logger.debug("【全量同步】跳过文件: %s", file_name)
+        return "skip"
 
-    def full_sync_strm_files(self):
+    def full_sync_strm_files(self, force: bool = False):
         """
         全量同步
+        force 为 True 时重新生成所有STRM并重新下载元数据
         """
         logger.info("【全量同步】开始执行全量同步任务...")
         
@@ -1184,9 +1889,14 @@ class p123linker(_PluginBase):
             return
 
         try:
-            # 准备媒体文件和数据文件扩展名列表
-            media_exts = set(f".{ext.strip().lower()}" for ext in self._user_rmt_mediaext.split(','))
-            data_exts = set(f".{ext.strip().lower()}" for ext in self._user_download_mediaext.split(','))
+            # 媒体文件和数据文件扩展名在加载配置时已解析
+            media_exts = self._media_exts
+            data_exts = self._data_exts
+            ext_kind = self._ext_kind
+            # 直链签名参数对所有文件相同
+            auth_context = self._auth_context()
+            # 本次同步已创建的目录
+            created_dirs = set()
             
             logger.info("【全量同步】配置信息：")
             logger.info(f"【全量同步】- 媒体文件后缀: {sorted(list(media_exts))}")
@@ -1194,19 +1904,10 @@ class p123linker(_PluginBase):
             logger.info(f"【全量同步】- 自动下载元数据: {self._full_sync_auto_download_mediainfo_enabled}")
             logger.info(f"【全量同步】- 域名: {self._custom_domain}")
             
-            paths = self._full_sync_strm_paths.strip().split('\n')
+            paths = self._parsed_sync_paths
             logger.info(f"【全量同步】待处理路径数量: {len(paths)}")
             
-            for path in paths:
-                if not path.strip():
-                    continue
-                
-                parts = path.split("#", 1)
-                if len(parts) != 2:
-                    logger.error(f"【全量同步】路径格式错误: {path}")
-                    continue
-                    
-                local_path, pan_path = parts
+            for local_path, pan_path, pan_path_parts in paths:
                 logger.info(f"【全量同步】处理路径对: 本地={local_path}, 网盘={pan_path}")
                 
                 # 检查本地路径是否存在，如果不存在则创建
@@ -1221,116 +1922,52 @@ class p123linker(_PluginBase):
                     logger.info("【全量同步】开始获取网盘目录信息...")
                     current_parent_id = 0
                     
-                    # 解析路径，移除开头和结尾的斜杠，然后分割
-                    pan_path = pan_path.strip('/')
                     if not pan_path:
                         logger.error("【全量同步】网盘路径不能为空")
                         continue
                         
-                    pan_path_parts = pan_path.split('/')
-                    logger.info(f"【全量同步】需要查找的目录层级: {pan_path_parts}")
+                    logger.info(f"【全量同步】需要查找的目录层级: {list(pan_path_parts)}")
                     
                     # 逐级查找目录
                     for part in pan_path_parts:
-                        if not part:  # 跳过空字符串
-                            continue
-                            
                         logger.info(f"【全量同步】查找目录: {part}")
-                        found = False
-                        
-                        # 获取当前层级的目录列表
-                        resp = self._client.fs_list({
-                            "limit": 100,
-                            "next": 0,
-                            "parentFileId": current_parent_id,
-                            "inDirectSpace": "false",
-                        })
-                        check_response(resp)
-                        
-                        # 在当前层级查找目标目录
-                        for item in resp.get("data", {}).get("InfoList", []):
-                            logger.debug(f"【全量同步】检查目录: {item.get('FileName')} (Type={item.get('Type')})")
-                            if item["FileName"] == part and bool(item["Type"]):  # Type=1 表示目录
-                                current_parent_id = int(item["FileId"])
-                                found = True
-                                logger.info(f"【全量同步】找到目录 {part}, ID: {current_parent_id}")
-                                break
-                                
-                        if not found:
-                            raise ValueError(f"未找到目录: {part}")
+                        current_parent_id = self._resolve_child(current_parent_id, part)
+                        logger.info(f"【全量同步】找到目录 {part}, ID: {current_parent_id}")
                     
                     parent_id = current_parent_id
                     logger.info(f"【全量同步】成功获取目录ID: {parent_id}")
+                    # 刷新增量同步使用的目录ID，目录被移动或重建后以此为准
+                    self._pan_path_id_cache[pan_path] = parent_id
                     
-                    # 开始遍历文件
+                    # 开始遍历文件，遍历与文件处理并发执行
                     logger.info(f"【全量同步】开始遍历目录下的文件...")
-                    for item in self.iterdir(
-                        client=self._client,
-                        parent_id=parent_id,
-                        interval=1,
-                        only_file=True
-                    ):
-                        try:
-                            # 检查文件扩展名
-                            file_ext = Path(item["FileName"]).suffix.lower()
-                            
-                            # 构建本地路径
-                            file_path = pan_path + "/" + item["relpath"]
-                            file_path = Path(local_path) / Path(file_path).relative_to(pan_path)
-                            file_target_dir = file_path.parent
-                            file_target_dir.mkdir(parents=True, exist_ok=True)
-                            
-                            if file_ext in media_exts:
-                                # 为媒体文件生成STRM
-                                original_name = file_path.stem
-                                file_name = original_name + ".strm"
-                                new_file_path = file_target_dir / file_name
-                                
-                                # 构建完整的文件路径，确保不以斜杠开头
-                                full_path = f"{pan_path}/{item['relpath']}"
-                                full_path = full_path.strip('/')
-                                # URL编码路径中的特殊字符
-                                encoded_path = quote(full_path)
-                                
-                                url = self._generate_auth_url(encoded_path)
-                                
-                                with open(new_file_path, "w", encoding="utf-8") as f:
-                                    f.write(url)
-                                    
-                                logger.info(f"【全量同步】生成STRM文件成功: {new_file_path}")
-                                
-                            elif self._full_sync_auto_download_mediainfo_enabled and file_ext in data_exts:
-                                # 下载元数据
-                                new_file_path = file_target_dir / item["FileName"]
-                                
-                                # 获取下载链接
-                                resp = self._client.download_info({
-                                    "Etag": item["Etag"],
-                                    "FileID": int(item["FileId"]),
-                                    "FileName": item["FileName"],
-                                    "S3KeyFlag": item["S3KeyFlag"],
-                                    "Size": int(item["Size"]),
-                                })
-                                check_response(resp)
-                                download_url = resp["data"]["DownloadUrl"]
-                                
-                                # 下载文件
-                                with requests.get(download_url, stream=True) as r:
-                                    r.raise_for_status()
-                                    with open(new_file_path, 'wb') as f:
-                                        for chunk in r.iter_content(chunk_size=8192):
-                                            f.write(chunk)
-                                            
-                                logger.info(f"【全量同步】下载元数据成功: {new_file_path}")
-                            else:
-                                logger.debug(f"【全量同步】跳过文件: {item['FileName']}")
-                                
-                        except Exception as e:
-                            logger.error(f"【全量同步】处理文件失败: {e}")
-                            continue
+                    path_start_time = int(time.time())
+                    stats = self.__run_pipeline(
+                        iterdir(
+                            client=self._client,
+                            parent_id=parent_id,
+                            interval=self._list_interval,
+                            only_file=True
+                        ),
+                        lambda item: self._process_full_sync_item(
+                            item, pan_path, local_path, ext_kind, auth_context, created_dirs, force
+                        ),
+                        "【全量同步】",
+                    )
+                    logger.info(
+                        "【全量同步】%s 处理完成：生成STRM %d 个，下载元数据 %d 个，"
+                        "未变化 %d 个，跳过 %d 个，失败 %d 个",
+                        pan_path, stats["strm"], stats["data"], stats["exists"],
+                        stats["skip"], stats["failed"],
+                    )
+                    if not stats["failed"]:
+                        self._last_sync_times[pan_path] = path_start_time
                             
                 except Exception as e:
                     logger.error(f"【全量同步】获取网盘目录ID失败: {e}")
+                    # 目录可能已被移动或删除，清空目录ID缓存
+                    self._pan_path_id_cache.pop(pan_path, None)
+                    self._dir_id_cache.clear()
                     continue
             
             logger.info("【全量同步】全量同步任务完成")
@@ -1354,9 +1991,104 @@ class p123linker(_PluginBase):
                 if self._scheduler.running:
                     self._scheduler.shutdown()
                 self._scheduler = None
+            if self._http:
+                # 只关闭连接池，不置空会话，仍在运行的同步任务可以继续下载
+                self._http.close()
         except Exception as e:
             print(str(e))
 
+    def _checkpoint_state(self):
+        """
+        保存增量同步进度：Etag 索引与已完成路径的同步时间
+        上一次保存尚未完成时跳过本次
+        """
+        if not self._checkpoint_lock.acquire(blocking=False):
+            return
+        try:
+            self.save_data("etag_index", self._etag_index.copy())
+            self.__update_config()
+        finally:
+            self._checkpoint_lock.release()
+
+    def _process_incremental_item(
+        self,
+        item: _FileItem,
+        pan_path: str,
+        local_path: str,
+        ext_kind: dict,
+        created_dirs: set,
+        since: int,
+        auth_context: tuple,
+    ):
+        """
+        增量同步单个文件：生成STRM或下载元数据
+        since 为该网盘路径上次成功同步的时间戳，created_dirs 记录本次同步已创建的目录
+        本地文件已存在且 Etag 与上次同步时相同的文件不再重复处理
+        返回处理结果：strm、data、exists 或 skip
+        """
+        # 检查文件修改时间
+        if item.update_time <= since:
+            logger.debug("【增量同步】跳过未修改的文件: %s", item.name)
+            return "skip"
+
+        # 检查文件扩展名
+        kind = ext_kind.get(os.path.splitext(item.name)[1].lower())
+        
+        # 构建本地路径，relpath 为相对于网盘同步目录的 posix 路径
+        relpath = item.relpath
+        file_path = os.path.join(local_path, relpath)
+        file_target_dir = os.path.dirname(file_path)
+        if file_target_dir not in created_dirs:
+            os.makedirs(file_target_dir, exist_ok=True)
+            created_dirs.add(file_target_dir)
+        
+        if kind == "media":
+            # 为媒体文件生成STRM
+            new_file_path = os.path.splitext(file_path)[0] + ".strm"
+            etag_key = str(item.id)
+            if self._etag_index.get(etag_key) == item.etag and os.path.exists(new_file_path):
+                return "exists"
+            
+            # 构建完整的文件路径，确保不以斜杠开头
+            full_path = f"{pan_path}/{relpath}".strip('/')
+            # 直链使用未编码的路径签名，无需先编码再解码
+            url = self._auth_url_fast(full_path, *auth_context, int(time.time()))
+            
+            _write_strm(new_file_path, url.encode("utf-8"))
+            self._etag_index[etag_key] = item.etag
+            logger.info("【增量同步】生成STRM文件成功: %s", new_file_path)
+            return "strm"
+            
+        elif kind == "data" and self._full_sync_auto_download_mediainfo_enabled:
+            # 下载元数据
+            new_file_path = file_path
+            etag_key = str(item.id)
+            if self._etag_index.get(etag_key) == item.etag:
+                try:
+                    if os.stat(new_file_path).st_size == item.size:
+                        return "exists"
+                except OSError:
+                    pass
+            
+            # 获取下载链接
+            resp = self._client.download_info(item.download_info_payload())
+            check_response(resp)
+            download_url = resp["data"]["DownloadUrl"]
+            
+            # 下载文件
+            with self._http.get(download_url, stream=True, timeout=(5, 60)) as r:
+                r.raise_for_status()
+                r.raw.decode_content = True
+                with open(new_file_path, 'wb') as f:
+                    shutil.copyfileobj(r.raw, f, length=1024 * 1024)
+                        
+            self._etag_index[etag_key] = item.etag
+            logger.info("【增量同步】下载元数据成功: %s", new_file_path)
+            return "data"
+
+        logger.debug("【增量同步】跳过文件: %s", item.name)
+        return "skip"
+
     def incremental_sync_files(self):
         """
         增量同步
@@ -1378,13 +2110,22 @@ class p123linker(_PluginBase):
         # 如果上次同步时间是0，说明还没有进行过同步，先进行一次全量同步
         if self._last_sync_time == 0:
             logger.info("【增量同步】首次运行，执行全量同步...")
-            self.full_sync_strm_files()
+            self.full_sync_strm_files(force=True)
             return
 
+        # 距上次同步太久时，大部分目录都需要重新遍历，直接执行全量同步
+        max_age = self._incremental_max_days * 24 * 60 * 60
+        if max_age and int(time.time()) - self._last_sync_time > max_age:
+            logger.info(
+                f"【增量同步】距上次同步已超过 {self._incremental_max_days} 天，执行全量同步..."
+            )
+            return self.full_sync_strm_files()
+
         try:
-            # 准备媒体文件和数据文件扩展名列表
-            media_exts = set(f".{ext.strip().lower()}" for ext in self._user_rmt_mediaext.split(','))
-            data_exts = set(f".{ext.strip().lower()}" for ext in self._user_download_mediaext.split(','))
+            # 媒体文件和数据文件扩展名在加载配置时已解析
+            media_exts = self._media_exts
+            data_exts = self._data_exts
+            ext_kind = self._ext_kind
             
             logger.info("【增量同步】配置信息：")
             logger.info(f"【增量同步】- 媒体文件后缀: {sorted(list(media_exts))}")
@@ -1393,21 +2134,26 @@ class p123linker(_PluginBase):
             logger.info(f"【增量同步】- 域名: {self._custom_domain}")
             logger.info(f"【增量同步】- 上次同步时间: {datetime.fromtimestamp(self._last_sync_time)}")
             
-            paths = self._full_sync_strm_paths.strip().split('\n')
+            paths = self._parsed_sync_paths
             logger.info(f"【增量同步】待处理路径数量: {len(paths)}")
             
             current_time = int(time.time())
+            # 直链签名参数对所有文件相同
+            auth_context = self._auth_context()
+            # 本次同步已创建的目录
+            created_dirs = set()
             
-            for path in paths:
-                if not path.strip():
-                    continue
-                
-                parts = path.split("#", 1)
-                if len(parts) != 2:
-                    logger.error(f"【增量同步】路径格式错误: {path}")
-                    continue
-                    
-                local_path, pan_path = parts
+            # 一次解析所有未缓存的网盘路径，共同的上级目录只查找一次
+            missing = [
+                (pan_path, pan_path_parts)
+                for _, pan_path, pan_path_parts in paths
+                if pan_path and pan_path not in self._pan_path_id_cache
+            ]
+            if missing:
+                logger.info(f"【增量同步】开始获取网盘目录信息，待查找路径数量: {len(missing)}")
+                self._pan_path_id_cache.update(self._resolve_pan_paths(missing))
+            
+            for local_path, pan_path, pan_path_parts in paths:
                 logger.info(f"【增量同步】处理路径对: 本地={local_path}, 网盘={pan_path}")
                 
                 # 检查本地路径是否存在，如果不存在则创建
@@ -1415,132 +2161,63 @@ class p123linker(_PluginBase):
                 if not local_dir.exists():
                     logger.info(f"【增量同步】创建本地目录: {local_path}")
                     local_dir.mkdir(parents=True, exist_ok=True)
+                created_dirs.add(os.path.normpath(local_path))
                 
                 # 获取网盘目录ID
                 try:
-                    # 先列出根目录
-                    logger.info("【增量同步】开始获取网盘目录信息...")
-                    current_parent_id = 0
-                    
-                    # 解析路径，移除开头和结尾的斜杠，然后分割
-                    pan_path = pan_path.strip('/')
                     if not pan_path:
                         logger.error("【增量同步】网盘路径不能为空")
                         continue
-                        
-                    pan_path_parts = pan_path.split('/')
-                    logger.info(f"【增量同步】需要查找的目录层级: {pan_path_parts}")
-                    
-                    # 逐级查找目录
-                    for part in pan_path_parts:
-                        if not part:  # 跳过空字符串
-                            continue
-                            
-                        logger.info(f"【增量同步】查找目录: {part}")
-                        found = False
-                        
-                        # 获取当前层级的目录列表
-                        resp = self._client.fs_list({
-                            "limit": 100,
-                            "next": 0,
-                            "parentFileId": current_parent_id,
-                            "inDirectSpace": "false",
-                        })
-                        check_response(resp)
-                        
-                        # 在当前层级查找目标目录
-                        for item in resp.get("data", {}).get("InfoList", []):
-                            logger.debug(f"【增量同步】检查目录: {item.get('FileName')} (Type={item.get('Type')})")
-                            if item["FileName"] == part and bool(item["Type"]):  # Type=1 表示目录
-                                current_parent_id = int(item["FileId"])
-                                found = True
-                                logger.info(f"【增量同步】找到目录 {part}, ID: {current_parent_id}")
-                                break
-                                
-                        if not found:
-                            raise ValueError(f"未找到目录: {part}")
                     
-                    parent_id = current_parent_id
-                    logger.info(f"【增量同步】成功获取目录ID: {parent_id}")
+                    # 目录ID已在处理路径前统一解析
+                    parent_id = self._pan_path_id_cache.get(pan_path)
+                    if parent_id is None:
+                        raise ValueError(f"未找到目录: {pan_path}")
+                    logger.info(f"【增量同步】网盘目录ID: {parent_id}")
                     
                     # 开始遍历文件
                     logger.info(f"【增量同步】开始遍历目录下的文件...")
-                    for item in self.iterdir(
-                        client=self._client,
-                        parent_id=parent_id,
-                        interval=1,
-                        only_file=True
-                    ):
-                        try:
-                            # 检查文件修改时间
-                            update_time = int(item.get("UpdateTime", 0))
-                            if update_time <= self._last_sync_time:
-                                logger.debug(f"【增量同步】跳过未修改的文件: {item['FileName']}")
-                                continue
-
-                            # 检查文件扩展名
-                            file_ext = Path(item["FileName"]).suffix.lower()
-                            
-                            # 构建本地路径
-                            file_path = pan_path + "/" + item["relpath"]
-                            file_path = Path(local_path) / Path(file_path).relative_to(pan_path)
-                            file_target_dir = file_path.parent
-                            file_target_dir.mkdir(parents=True, exist_ok=True)
-                            
-                            if file_ext in media_exts:
-                                # 为媒体文件生成STRM
-                                original_name = file_path.stem
-                                file_name = original_name + ".strm"
-                                new_file_path = file_target_dir / file_name
-                                
-                                # 构建完整的文件路径，确保不以斜杠开头
-                                full_path = f"{pan_path}/{item['relpath']}"
-                                full_path = full_path.strip('/')
-                                # URL编码路径中的特殊字符
-                                encoded_path = quote(full_path)
-                                
-                                url = self._generate_auth_url(encoded_path)
-                                
-                                with open(new_file_path, "w", encoding="utf-8") as f:
-                                    f.write(url)
-                                    
-                                logger.info(f"【增量同步】生成STRM文件成功: {new_file_path}")
-                                
-                            elif self._full_sync_auto_download_mediainfo_enabled and file_ext in data_exts:
-                                # 下载元数据
-                                new_file_path = file_target_dir / item["FileName"]
-                                
-                                # 获取下载链接
-                                resp = self._client.download_info({
-                                    "Etag": item["Etag"],
-                                    "FileID": int(item["FileId"]),
-                                    "FileName": item["FileName"],
-                                    "S3KeyFlag": item["S3KeyFlag"],
-                                    "Size": int(item["Size"]),
-                                })
-                                check_response(resp)
-                                download_url = resp["data"]["DownloadUrl"]
-                                
-                                # 下载文件
-                                with requests.get(download_url, stream=True) as r:
-                                    r.raise_for_status()
-                                    with open(new_file_path, 'wb') as f:
-                                        for chunk in r.iter_content(chunk_size=8192):
-                                            f.write(chunk)
-                                            
-                                logger.info(f"【增量同步】下载元数据成功: {new_file_path}")
-                            else:
-                                logger.debug(f"【增量同步】跳过文件: {item['FileName']}")
-                                
-                        except Exception as e:
-                            logger.error(f"【增量同步】处理文件失败: {e}")
-                            continue
+                    # 每个路径使用各自的同步时间，失败的路径下次从原时间继续
+                    since = self._last_sync_times.get(pan_path, self._last_sync_time)
+                    path_start_time = int(time.time())
+                    stats = self.__run_pipeline(
+                        iterdir(
+                            client=self._client,
+                            parent_id=parent_id,
+                            interval=self._list_interval,
+                            only_file=True,
+                            as_tuple=True,
+                        ),
+                        lambda item: self._process_incremental_item(
+                            item, pan_path, local_path, ext_kind,
+                            created_dirs, since, auth_context,
+                        ),
+                        "【增量同步】",
+                        checkpoint=self._checkpoint_state,
+                    )
+                    logger.info(
+                        "【增量同步】%s 处理完成：生成STRM %d 个，下载元数据 %d 个，"
+                        "未变化 %d 个，跳过 %d 个，失败 %d 个",
+                        pan_path, stats["strm"], stats["data"], stats["exists"],
+                        stats["skip"], stats["failed"],
+                    )
+                    if stats["failed"]:
+                        logger.warning(f"【增量同步】{pan_path} 存在处理失败的文件，下次同步时重试")
+                        self._last_sync_times.setdefault(pan_path, since)
+                    else:
+                        self._last_sync_times[pan_path] = path_start_time
                             
                 except Exception as e:
                     logger.error(f"【增量同步】获取网盘目录ID失败: {e}")
+                    # 目录可能已被移动或删除，下次同步时重新查找
+                    self._pan_path_id_cache.pop(pan_path, None)
+                    self._dir_id_cache.clear()
+                    # 保留该路径的同步时间，下次从原时间继续
+                    self._last_sync_times.setdefault(pan_path, self._last_sync_time)
                     continue
             
-            # 更新最后同步时间
+            # 保存 Etag 索引，更新最后同步时间
+            self.save_data("etag_index", self._etag_index)
             self._last_sync_time = current_time
             self.__update_config()
             logger.info(f"【增量同步】更新同步时间戳: {datetime.fromtimestamp(self._last_sync_time)}")